@@ -1,7 +1,1171 @@
-def greet(name: str) -> None:
-    """Print a greeting to the given name."""
-    print(f"Hello, {name}!")
+"""Greet names, one "Hello, {name}!" line each.
 
+Importing this module has no side effects and is kept cheap: modules that
+are only needed by the CLI (argparse, gzip, mmap) are imported where they
+are used, and typing-only names are imported for type checkers alone.
+Run ``python apps/hello_startup_bench.py`` to check the import-time budget.
+"""
 
-print("hello")
-greet("World")
\ No newline at end of file
+from __future__ import annotations
+
+import os
+import sys
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    import argparse
+    from collections import OrderedDict
+    from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+    from typing import BinaryIO, TypedDict
+
+    from _typeshed import SupportsWrite
+
+    class Checkpoint(TypedDict):
+        input: str
+        output: str
+        input_size: int
+        input_mtime_ns: int
+        input_offset: int
+        output_offset: int
+        count: int
+        done: bool
+
+DEFAULT_BATCH_SIZE = 4096
+DEFAULT_SHARD_BYTES = 4 * 1024 * 1024
+DEFAULT_ENCODING = "utf-8"
+MMAP_CHUNK_SIZE = 1 << 20
+DEFAULT_TEMPLATE = "Hello, {name}!"
+DEFAULT_TEMPLATE_CACHE_SIZE = 128
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+DEFAULT_METRICS_INTERVAL = 10.0
+DEFAULT_CHECKPOINT_EVERY = 1_000_000
+# Histogram label values: "greet" observes one greeting per greet() call,
+# "batch" one batch per step of greet_many() / greet_many_cached().
+METRIC_SOURCES = ("greet", "batch")
+LATENCY_BUCKETS = (
+    1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.5, 1.0,
+)  # fmt: skip
+
+# The GreetMetrics collecting for greet(), greet_many() and greet_many_cached(),
+# or None when instrumentation is off. Set it with enable_instrumentation().
+_metrics: GreetMetrics | None = None
+
+
+def compile_template(source: str) -> Callable[..., str]:
+    """Compile a str.format-style template into a keyword-only render function.
+
+    Fields must be plain names such as {name} or {surname}, optionally with a
+    conversion and a format spec ({name!r}, {count:>5}); positional, indexed
+    and attribute fields are rejected. The template is turned into an f-string
+    once, so rendering costs a single function call, and extra keyword
+    arguments are ignored so every template can be called with name=...
+    """
+    from string import Formatter
+
+    body: list[str] = []
+    fields: list[str] = []
+    for literal, field, spec, conversion in Formatter().parse(source):
+        body.append(literal.replace("{", "{{").replace("}", "}}"))
+        if field is None:
+            continue
+        spec = spec or ""
+        if not field.isidentifier() or field.startswith("_"):
+            raise ValueError(f"unsupported template field {{{field}}} in {source!r}")
+        if any(c in spec for c in "{}\\'\""):
+            raise ValueError(f"unsupported format spec {spec!r} in {source!r}")
+        if field not in fields:
+            fields.append(field)
+        body.append(
+            "{"
+            + field
+            + (f"!{conversion}" if conversion else "")
+            + (f":{spec}" if spec else "")
+            + "}"
+        )
+    # A bare "*" must be followed by a named parameter, so only emit it with fields.
+    params = "".join(f"{field}, " for field in fields)
+    if params:
+        params = f"*, {params}"
+    code = f"def render({params}**__):\n    return f{''.join(body)!r}\n"
+    namespace: dict[str, Callable[..., str]] = {}
+    try:
+        # Safe: fields are checked identifiers, literals and specs are escaped
+        # into one f-string, and the code runs with no builtins.
+        exec(code, {"__builtins__": {}}, namespace)  # noqa: S102
+    except SyntaxError as e:
+        raise ValueError(f"invalid template {source!r}: {e.msg}") from None
+    return namespace["render"]
+
+
+class TemplateRegistry:
+    """Greeting templates by key (tenant, locale, ...) with an LRU of compiled forms.
+
+    Template sources are registered under a key; get() returns the compiled
+    render function, compiling each distinct source at most once while it
+    stays among the maxsize most recently used. hits, misses and evictions
+    count cache activity since construction or the last clear().
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_TEMPLATE_CACHE_SIZE) -> None:
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be at least 1, got {maxsize}")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._sources: dict[str, str] = {"default": DEFAULT_TEMPLATE}
+        # Least recently used first. Created on first compile so that the
+        # module-level registry does not import collections at import time.
+        self._compiled: OrderedDict[str, Callable[..., str]] | None = None
+
+    def register(self, key: str, source: str) -> None:
+        """Register source under key, raising ValueError if it does not compile."""
+        self.compile(source)
+        self._sources[key] = source
+
+    def source(self, key: str) -> str:
+        """Return the template source registered under key."""
+        return self._sources[key]
+
+    def get(self, key: str) -> Callable[..., str]:
+        """Return the render function for the template registered under key."""
+        return self.compile(self._sources[key])
+
+    def compile(self, source: str) -> Callable[..., str]:
+        """Return the render function for source from the cache, compiling on a miss."""
+        compiled = self._compiled
+        if compiled is None:
+            from collections import OrderedDict
+
+            compiled = self._compiled = OrderedDict()
+        render = compiled.get(source)
+        if render is not None:
+            compiled.move_to_end(source)
+            self.hits += 1
+            return render
+        render = compile_template(source)
+        self.misses += 1
+        if len(compiled) >= self.maxsize:
+            compiled.popitem(last=False)
+            self.evictions += 1
+        compiled[source] = render
+        return render
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._compiled or ()),
+            "maxsize": self.maxsize,
+        }
+
+    def clear(self) -> None:
+        """Drop all compiled templates and reset the counters."""
+        self._compiled = None
+        self.hits = self.misses = self.evictions = 0
+
+
+templates = TemplateRegistry()
+
+
+def greet(name: str, template: str | None = None, **fields: str) -> None:
+    """Print a greeting to the given name.
+
+    With template, the greeting is rendered from the template registered
+    under that key in templates, with name and fields as its values.
+    """
+    if _metrics is not None:
+        _metrics.greet(name, template, fields)
+    elif template is None:
+        print(f"Hello, {name}!")
+    else:
+        print(templates.get(template)(name=name, **fields))
+
+
+def greet_many(
+    names: Iterable[str],
+    out: SupportsWrite[str] | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    template: str | None = None,
+    fields: Mapping[str, str] | None = None,
+) -> int:
+    """Write a greeting for each name to out, batch_size greetings per write.
+
+    The output is identical to calling greet(name, template, **fields) once
+    per name, but the lines are collected in a reusable buffer so the stream
+    sees one large write per batch instead of one small write per name.
+    fields are the template's other values ({title}, {surname}, ...), shared
+    by every name. Returns the number of names.
+    """
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+    if out is None:
+        out = sys.stdout
+    render = None if template is None else templates.get(template)
+    if fields is None:
+        fields = {}
+    if _metrics is not None:
+        if render is None:
+            format_batch = format_greetings
+        else:
+            template_render = render
+            template_fields = fields
+
+            def format_batch(batch: list[str]) -> str:
+                return "".join(
+                    [f"{template_render(name=name, **template_fields)}\n" for name in batch]
+                )
+
+        encoding = getattr(out, "encoding", None)
+        return _metrics.greet_batches(names, batch_size, format_batch, out.write, encoding)
+    write = out.write
+    buffer: list[str] = []
+    append = buffer.append
+    count = 0
+    # Two copies of the loop so the default one keeps its inline f-string
+    # with no per-name template check.
+    if render is None:
+        for name in names:
+            append(f"Hello, {name}!\n")
+            if len(buffer) >= batch_size:
+                write("".join(buffer))
+                count += len(buffer)
+                buffer.clear()
+    else:
+        for name in names:
+            append(f"{render(name=name, **fields)}\n")
+            if len(buffer) >= batch_size:
+                write("".join(buffer))
+                count += len(buffer)
+                buffer.clear()
+    if buffer:
+        write("".join(buffer))
+        count += len(buffer)
+    return count
+
+
+def format_greetings(names: list[str]) -> str:
+    """Return the greet() output for names as a single string."""
+    return "".join([f"Hello, {name}!\n" for name in names])
+
+
+def iter_shards(path: str, shard_bytes: int) -> Iterator[tuple[int, int]]:
+    """Yield (start, end) byte ranges covering path, each ending after a newline or at EOF."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        start = 0
+        while start < size:
+            end = start + shard_bytes
+            if end >= size:
+                end = size
+            else:
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            yield start, end
+            start = end
+
+
+def greet_shard(
+    path: str, start: int, end: int, encoding: str, out_encoding: str
+) -> tuple[int, bytes]:
+    """Greet the names in bytes start:end of path; return (count, encoded greetings).
+
+    Lines are split the way a text-mode file splits them (\\n, \\r\\n and \\r),
+    and blank lines are skipped, so the result matches the serial CLI path.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode(encoding)
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    names = [name for name in text.split("\n") if name]
+    return len(names), format_greetings(names).encode(out_encoding)
+
+
+def greet_parallel(
+    paths: Sequence[str],
+    out: BinaryIO,
+    workers: int | None = None,
+    shard_bytes: int = DEFAULT_SHARD_BYTES,
+    encoding: str = DEFAULT_ENCODING,
+    out_encoding: str = DEFAULT_ENCODING,
+) -> int:
+    """Greet the names in uncompressed files using a process pool; write in input order.
+
+    Each file is cut into byte ranges of about shard_bytes that end on line
+    boundaries. A worker reads its own range, formats it and returns the
+    encoded greetings, so the parent only hands out offsets and copies bytes
+    to out; it never iterates or pickles individual names. Up to workers
+    processes (default: os.cpu_count()) run at once, at most two shards per
+    worker are in flight, and shards are written in input order, making the
+    output identical to the serial path. encoding must be ASCII-compatible
+    (e.g. UTF-8, Latin-1) so that byte ranges can be split at b"\\n".
+    Returns the number of names.
+    """
+    from collections import deque
+    from concurrent.futures import Future, ProcessPoolExecutor
+
+    if shard_bytes < 1:
+        raise ValueError(f"shard_bytes must be at least 1, got {shard_bytes}")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError(f"workers must be at least 1, got {workers}")
+    write = out.write
+    count = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: deque[Future[tuple[int, bytes]]] = deque()
+
+        def drain(limit: int) -> None:
+            nonlocal count
+            while len(pending) > limit:
+                shard_count, data = pending.popleft().result()
+                write(data)
+                count += shard_count
+
+        for path in paths:
+            for start, end in iter_shards(path, shard_bytes):
+                drain(2 * workers - 1)
+                pending.append(
+                    executor.submit(greet_shard, path, start, end, encoding, out_encoding)
+                )
+        drain(0)
+    return count
+
+
+class GreetingCache:
+    """Thread-safe LRU of encoded greeting lines, keyed by name.
+
+    line(name) returns b"Hello, {name}!\\n" in encoding, building and encoding
+    it only on a miss. The cache holds at most max_entries lines and at most
+    max_bytes bytes of encoded lines (keys not counted); least recently used
+    lines are evicted first, and a line larger than max_bytes is never cached.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int = DEFAULT_CACHE_BYTES,
+        encoding: str = DEFAULT_ENCODING,
+    ) -> None:
+        import threading
+        from collections import OrderedDict
+
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be at least 1, got {max_entries}")
+        if max_bytes < 1:
+            raise ValueError(f"max_bytes must be at least 1, got {max_bytes}")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.encoding = encoding
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size_bytes = 0
+        # OrderedDict rather than a plain dict: evicting from the front of a
+        # dict rescans the deleted slots left there, which goes quadratic
+        # once evictions are frequent.
+        self._lines: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def line(self, name: str) -> bytes:
+        """Return the encoded greeting line for name."""
+        return self.lines([name])[0]
+
+    def lines(self, names: Iterable[str]) -> list[bytes]:
+        """Return the encoded greeting lines for names, taking the lock once."""
+        cached = self._lines
+        encoding = self.encoding
+        max_entries = self.max_entries
+        max_bytes = self.max_bytes
+        move_to_end = cached.move_to_end
+        popitem = cached.popitem
+        result: list[bytes] = []
+        append = result.append
+        with self._lock:
+            hits = 0
+            for name in names:
+                data = cached.get(name)
+                if data is not None:
+                    move_to_end(name)
+                    hits += 1
+                else:
+                    data = f"Hello, {name}!\n".encode(encoding)
+                    size = len(data)
+                    if size > max_bytes:
+                        self.misses += 1
+                        append(data)
+                        continue
+                    while cached and (
+                        len(cached) >= max_entries or self.size_bytes + size > max_bytes
+                    ):
+                        self.size_bytes -= len(popitem(last=False)[1])
+                        self.evictions += 1
+                    self.size_bytes += size
+                    self.misses += 1
+                    cached[name] = data
+                append(data)
+            self.hits += hits
+        return result
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hit_rate(),
+                "entries": len(self._lines),
+                "bytes": self.size_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        """Drop all cached lines and reset the counters."""
+        with self._lock:
+            self._lines.clear()
+            self.size_bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+
+def greet_many_cached(
+    names: Iterable[str],
+    out: BinaryIO,
+    cache: GreetingCache,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> int:
+    """Like greet_many(), but write cache-encoded lines to a binary stream.
+
+    Names are looked up a batch at a time, so the cache lock is taken once
+    per batch and repeated names skip formatting and encoding entirely.
+    Returns the number of names.
+    """
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+    if _metrics is not None:
+
+        def format_batch(batch: list[str]) -> bytes:
+            return b"".join(cache.lines(batch))
+
+        return _metrics.greet_batches(names, batch_size, format_batch, out.write)
+    write = out.write
+    lines = cache.lines
+    batch: list[str] = []
+    append = batch.append
+    count = 0
+    for name in names:
+        append(name)
+        if len(batch) >= batch_size:
+            write(b"".join(lines(batch)))
+            count += len(batch)
+            batch.clear()
+    if batch:
+        write(b"".join(lines(batch)))
+        count += len(batch)
+    return count
+
+
+class LatencyHistogram:
+    """Prometheus-style histogram of durations in seconds."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        from bisect import bisect_left
+
+        self._bisect = bisect_left
+        self.buckets = tuple(sorted(buckets))
+        # One count per bucket upper bound, plus a final +Inf bucket.
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[self._bisect(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """Return (upper bound, cumulative count) pairs, ending with "+Inf"."""
+        pairs = []
+        total = 0
+        for bound, count in zip([*map(repr, self.buckets), "+Inf"], self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+
+class GreetMetrics:
+    """Counters, latency histograms and hooks for instrumented greetings.
+
+    Install an instance with enable_instrumentation(). Each formatting step
+    and each write is observed separately, in histograms labelled by source:
+    "greet" holds one greeting per observation (greet()), "batch" one batch
+    (greet_many(), greet_many_cached()). Hooks added with add_hook() run for
+    every name, before(name) ahead of formatting and after(name) once its
+    line has been written; hook time is not measured.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        import threading
+        import time
+
+        self._clock = time.perf_counter
+        self._lock = threading.Lock()
+        self.greetings = 0
+        self.bytes_written = 0
+        self.format_seconds = {source: LatencyHistogram(buckets) for source in METRIC_SOURCES}
+        self.write_seconds = {source: LatencyHistogram(buckets) for source in METRIC_SOURCES}
+        self._before: list[Callable[[str], object]] = []
+        self._after: list[Callable[[str], object]] = []
+
+    def add_hook(
+        self,
+        before: Callable[[str], object] | None = None,
+        after: Callable[[str], object] | None = None,
+    ) -> None:
+        """Register callbacks to run with each name before and/or after its greeting."""
+        if before is not None:
+            self._before.append(before)
+        if after is not None:
+            self._after.append(after)
+
+    def greet(self, name: str, template: str | None, fields: dict[str, str]) -> None:
+        """Instrumented body of greet()."""
+        if template is None:
+            format_batch = format_greetings
+        else:
+            render = templates.get(template)
+
+            def format_batch(batch: list[str]) -> str:
+                return f"{render(name=batch[0], **fields)}\n"
+
+        self.greet_batches(
+            [name], 1, format_batch, sys.stdout.write, sys.stdout.encoding, source="greet"
+        )
+
+    def greet_batches(
+        self,
+        names: Iterable[str],
+        batch_size: int,
+        format_batch: Callable[[list[str]], str | bytes],
+        write: Callable[..., object],
+        encoding: str | None = None,
+        source: str = "batch",
+    ) -> int:
+        """Format and write names batch_size at a time, recording each step under source."""
+        from itertools import islice
+
+        clock = self._clock
+        format_seconds = self.format_seconds[source]
+        write_seconds = self.write_seconds[source]
+        names = iter(names)
+        count = 0
+        while batch := list(islice(names, batch_size)):
+            for hook in self._before:
+                for name in batch:
+                    hook(name)
+            start = clock()
+            data = format_batch(batch)
+            formatted = clock()
+            write(data)
+            written = clock()
+            if isinstance(data, bytes) or data.isascii():
+                size = len(data)
+            else:
+                size = len(data.encode(encoding or DEFAULT_ENCODING, "replace"))
+            with self._lock:
+                self.greetings += len(batch)
+                self.bytes_written += size
+                format_seconds.observe(formatted - start)
+                write_seconds.observe(written - formatted)
+            for hook in self._after:
+                for name in batch:
+                    hook(name)
+            count += len(batch)
+        return count
+
+    def snapshot(self) -> dict[str, object]:
+        """Return the current metrics as a JSON-serializable dict."""
+        with self._lock:
+            snapshot: dict[str, object] = {
+                "greetings_total": self.greetings,
+                "bytes_written_total": self.bytes_written,
+            }
+            for name, histograms in (
+                ("format_seconds", self.format_seconds),
+                ("write_seconds", self.write_seconds),
+            ):
+                snapshot[name] = {
+                    source: {
+                        "buckets": dict(histogram.cumulative()),
+                        "count": histogram.count,
+                        "sum": histogram.sum,
+                    }
+                    for source, histogram in histograms.items()
+                }
+            return snapshot
+
+    def prometheus_text(self) -> str:
+        """Return the current metrics in the Prometheus text exposition format."""
+        with self._lock:
+            lines = [
+                "# HELP hello_greetings_total Greetings written.",
+                "# TYPE hello_greetings_total counter",
+                f"hello_greetings_total {self.greetings}",
+                "# HELP hello_bytes_written_total Encoded bytes of greetings written.",
+                "# TYPE hello_bytes_written_total counter",
+                f"hello_bytes_written_total {self.bytes_written}",
+            ]
+            for name, histograms, help_text in (
+                ("format_seconds", self.format_seconds, "Time spent formatting greetings."),
+                ("write_seconds", self.write_seconds, "Time spent writing greetings."),
+            ):
+                lines += [
+                    (
+                        f"# HELP hello_{name} {help_text} "
+                        'source="greet" observes single greetings, source="batch" whole batches.'
+                    ),
+                    f"# TYPE hello_{name} histogram",
+                ]
+                for source, histogram in histograms.items():
+                    lines += [
+                        *(
+                            f'hello_{name}_bucket{{source="{source}",le="{bound}"}} {count}'
+                            for bound, count in histogram.cumulative()
+                        ),
+                        f'hello_{name}_sum{{source="{source}"}} {histogram.sum!r}',
+                        f'hello_{name}_count{{source="{source}"}} {histogram.count}',
+                    ]
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str, fmt: str = "prometheus") -> None:
+        """Atomically write the metrics to path as "prometheus" text or "json"."""
+        if fmt == "prometheus":
+            text = self.prometheus_text()
+        elif fmt == "json":
+            import json
+
+            text = json.dumps(self.snapshot(), indent=2) + "\n"
+        else:
+            raise ValueError(f"unknown metrics format {fmt!r}")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+
+def enable_instrumentation(metrics: GreetMetrics | None = None) -> GreetMetrics:
+    """Start recording greetings into metrics (a new GreetMetrics by default)."""
+    global _metrics
+    _metrics = metrics if metrics is not None else GreetMetrics()
+    return _metrics
+
+
+def disable_instrumentation() -> None:
+    """Stop recording greetings; the hot paths go back to a single None check."""
+    global _metrics
+    _metrics = None
+
+
+class MetricsExporter:
+    """Export a GreetMetrics to a file every interval seconds from a daemon thread."""
+
+    def __init__(
+        self,
+        metrics: GreetMetrics,
+        path: str,
+        interval: float = DEFAULT_METRICS_INTERVAL,
+        fmt: str = "prometheus",
+    ) -> None:
+        import threading
+
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.fmt = fmt
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="hello-metrics", daemon=True)
+
+    def _export(self) -> bool:
+        try:
+            self.metrics.export(self.path, self.fmt)
+        except OSError as e:
+            print(f"hello.py: cannot write metrics to {self.path}: {e}", file=sys.stderr)
+            return False
+        return True
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self._export()
+
+    def start(self) -> None:
+        """Write a first export, raising OSError if path is not writable, then start the timer."""
+        self.metrics.export(self.path, self.fmt)
+        self._thread.start()
+
+    def stop(self) -> bool:
+        """Stop the timer and write a final export; return False if it failed."""
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        return self._export()
+
+
+def iter_names(lines: Iterable[str]) -> Iterator[str]:
+    """Yield one name per line, dropping line endings and blank lines."""
+    for line in lines:
+        name = line.rstrip("\r\n")
+        if name:
+            yield name
+
+
+def iter_mmap_lines(path: str, encoding: str = DEFAULT_ENCODING) -> Iterator[str]:
+    """Yield the lines of an uncompressed file through a read-only memory map.
+
+    The map is decoded in chunks of about MMAP_CHUNK_SIZE bytes, cut at line
+    boundaries, so large files are split without a readline() call per line
+    while memory use stays bounded by the chunk size. Lines are split the way
+    a text-mode file splits them (\n, \r\n and \r).
+    """
+    import mmap
+
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = 0
+            while start < size:
+                stop = min(start + MMAP_CHUNK_SIZE, size)
+                if stop < size:
+                    newline = mm.rfind(b"\n", start, stop)
+                    if newline == -1:
+                        newline = mm.find(b"\n", stop)
+                    stop = size if newline == -1 else newline + 1
+                text = mm[start:stop].decode(encoding)
+                if "\r" in text:
+                    text = text.replace("\r\n", "\n").replace("\r", "\n")
+                lines = text.split("\n")
+                if text.endswith("\n"):
+                    lines.pop()
+                yield from lines
+                start = stop
+
+
+def iter_source_lines(
+    source: str, encoding: str = DEFAULT_ENCODING, use_mmap: bool = False
+) -> Iterator[str]:
+    """Yield the lines of a single input: "-" for stdin, a .gz file or a plain file."""
+    if source == "-":
+        yield from sys.stdin
+    elif source.endswith(".gz"):
+        import gzip
+
+        with gzip.open(source, "rt", encoding=encoding) as f:
+            yield from f
+    elif use_mmap:
+        yield from iter_mmap_lines(source, encoding)
+    else:
+        with open(source, encoding=encoding) as f:
+            yield from f
+
+
+def iter_input_names(
+    sources: Sequence[str], encoding: str = DEFAULT_ENCODING, use_mmap: bool = False
+) -> Iterator[str]:
+    """Yield names from each source in turn, reading stdin when none are given."""
+    for source in sources or ["-"]:
+        yield from iter_names(iter_source_lines(source, encoding, use_mmap))
+
+
+def write_checkpoint(path: str, checkpoint: Checkpoint) -> None:
+    """Durably replace the checkpoint file at path with checkpoint."""
+    import json
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def greet_checkpointed(
+    input_path: str,
+    output_path: str,
+    checkpoint_path: str,
+    checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY,
+    encoding: str = DEFAULT_ENCODING,
+    cache: GreetingCache | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Checkpoint:
+    """Greet the names in input_path into output_path as a resumable job.
+
+    Greetings are written batch_size names at a time. Every checkpoint_every
+    names the output is flushed and fsynced, then checkpoint_path is
+    atomically replaced with the input byte offset, output byte offset and
+    name count reached, along with the input's size and mtime. If
+    checkpoint_path already exists the job resumes from it: the input must
+    be unchanged, it is seeked to its offset and the output truncated to its
+    offset, dropping anything written after the last checkpoint, so no name
+    is greeted twice. Smaller checkpoint_every values cost more fsyncs and
+    redo less work after a crash. Input lines are split like a text-mode file
+    (\n, \r\n and \r) and output lines are encoded as UTF-8. Returns the
+    final checkpoint, which has "done" set.
+    """
+    import json
+
+    if checkpoint_every < 1:
+        raise ValueError(f"checkpoint_every must be at least 1, got {checkpoint_every}")
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+    st = os.stat(input_path)
+    checkpoint: Checkpoint = {
+        "input": os.path.abspath(input_path),
+        "output": os.path.abspath(output_path),
+        "input_size": st.st_size,
+        "input_mtime_ns": st.st_mtime_ns,
+        "input_offset": 0,
+        "output_offset": 0,
+        "count": 0,
+        "done": False,
+    }
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            saved = json.load(f)
+        for key in ("input", "output", "input_size", "input_mtime_ns"):
+            if saved.get(key) != checkpoint[key]:
+                raise ValueError(
+                    f"checkpoint {checkpoint_path} is for {key} {saved.get(key)}, "
+                    f"not {checkpoint[key]}"
+                )
+        if os.path.getsize(output_path) < saved["output_offset"]:
+            raise ValueError(
+                f"{output_path} is shorter than checkpoint {checkpoint_path} records"
+            )
+        checkpoint = saved
+        if checkpoint["done"]:
+            return checkpoint
+
+    input_offset = checkpoint["input_offset"]
+    output_offset = checkpoint["output_offset"]
+    count = checkpoint["count"]
+    pending: list[str] = []
+    unsaved = 0
+    # A fresh job owns its output file and starts it empty.
+    output_mode = "r+b" if output_offset else "wb"
+    with open(input_path, "rb") as src, open(output_path, output_mode) as out:
+        src.seek(input_offset)
+        out.truncate(output_offset)
+        out.seek(output_offset)
+
+        def write_pending() -> None:
+            if cache is not None:
+                out.write(b"".join(cache.lines(pending)))
+            else:
+                out.write(format_greetings(pending).encode(DEFAULT_ENCODING))
+            pending.clear()
+
+        def save(done: bool) -> None:
+            write_pending()
+            out.flush()
+            os.fsync(out.fileno())
+            checkpoint.update(
+                input_offset=input_offset,
+                output_offset=out.tell(),
+                count=count,
+                done=done,
+            )
+            write_checkpoint(checkpoint_path, checkpoint)
+
+        for line in src:
+            input_offset += len(line)
+            name = line.rstrip(b"\r\n")
+            if not name:
+                continue
+            if b"\r" in name:
+                # A bare \r also ends a line, as in the text-mode CLI path.
+                # Checkpoints still fall on \n boundaries.
+                names = [part.decode(encoding) for part in name.split(b"\r") if part]
+                pending += names
+                count += len(names)
+                unsaved += len(names)
+            else:
+                pending.append(name.decode(encoding))
+                count += 1
+                unsaved += 1
+            if unsaved >= checkpoint_every:
+                save(done=False)
+                unsaved = 0
+            elif len(pending) >= batch_size:
+                write_pending()
+        save(done=True)
+    return checkpoint
+
+
+def demo() -> None:
+    """Print the original hello-world demo output."""
+    print("hello")
+    greet("World")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Greet every name read from stdin or files, one name per line."
+    )
+    parser.add_argument(
+        "files",
+        nargs="*",
+        metavar="FILE",
+        help='input files; "-" reads stdin, *.gz files are decompressed (default: stdin)',
+    )
+    parser.add_argument(
+        "--mmap",
+        action="store_true",
+        help="read uncompressed files through a memory map instead of line by line",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"greetings per output write (default: {DEFAULT_BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="split plain input FILEs into byte ranges greeted by this many processes; "
+        "0 means one per CPU (default: 1)",
+    )
+    parser.add_argument(
+        "--shard-bytes",
+        type=int,
+        default=DEFAULT_SHARD_BYTES,
+        help=f"input bytes per worker task when --workers is not 1 (default: {DEFAULT_SHARD_BYTES})",
+    )
+    parser.add_argument(
+        "--template",
+        metavar="TEXT",
+        help='greeting template with {name} and other fields, e.g. "Dear {title} {name}" '
+        f"(default: {DEFAULT_TEMPLATE!r})",
+    )
+    parser.add_argument(
+        "--field",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="value for a --template field; may be repeated",
+    )
+    parser.add_argument(
+        "--cache-entries",
+        type=int,
+        default=0,
+        help="memoize encoded greetings for up to this many distinct names (default: off)",
+    )
+    parser.add_argument(
+        "--cache-bytes",
+        type=int,
+        default=DEFAULT_CACHE_BYTES,
+        help=f"max encoded bytes held by --cache-entries (default: {DEFAULT_CACHE_BYTES})",
+    )
+    parser.add_argument(
+        "--cache-stats",
+        action="store_true",
+        help="print greeting cache statistics to stderr when done",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        metavar="PATH",
+        help="run as a resumable job over a single FILE, saving progress to PATH "
+        "and resuming from it if it exists; requires --output",
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=DEFAULT_CHECKPOINT_EVERY,
+        help=f"names between --checkpoint saves (default: {DEFAULT_CHECKPOINT_EVERY})",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        metavar="PATH",
+        help="output file for --checkpoint jobs",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        metavar="PATH",
+        help="record greeting metrics and export them to PATH periodically and at exit",
+    )
+    parser.add_argument(
+        "--metrics-format",
+        choices=("prometheus", "json"),
+        default="prometheus",
+        help="--metrics-file format (default: prometheus)",
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=DEFAULT_METRICS_INTERVAL,
+        help=f"seconds between --metrics-file exports (default: {DEFAULT_METRICS_INTERVAL})",
+    )
+    parser.add_argument(
+        "--encoding",
+        default=DEFAULT_ENCODING,
+        help=f"input file encoding (default: {DEFAULT_ENCODING})",
+    )
+    parser.add_argument(
+        "--demo",
+        action="store_true",
+        help='print the "hello" / "Hello, World!" demo and exit',
+    )
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    if args.workers < 0:
+        parser.error("--workers must not be negative")
+    if args.shard_bytes < 1:
+        parser.error("--shard-bytes must be at least 1")
+    if args.workers != 1 and (
+        not args.files or any(f == "-" or f.endswith(".gz") for f in args.files)
+    ):
+        parser.error("--workers requires uncompressed input FILEs (not stdin or .gz)")
+    if args.workers != 1 and args.mmap:
+        parser.error("--mmap cannot be combined with --workers")
+    if args.cache_entries < 0:
+        parser.error("--cache-entries must not be negative")
+    if args.cache_bytes < 1:
+        parser.error("--cache-bytes must be at least 1")
+    if args.cache_entries and args.workers != 1:
+        parser.error("--cache-entries cannot be combined with --workers")
+    if args.metrics_file and args.workers != 1:
+        parser.error("--metrics-file cannot be combined with --workers")
+    if args.metrics_interval <= 0:
+        parser.error("--metrics-interval must be positive")
+    if args.checkpoint_every < 1:
+        parser.error("--checkpoint-every must be at least 1")
+    if args.output and not args.checkpoint:
+        parser.error("--output is only used with --checkpoint")
+    fields: dict[str, str] = {}
+    for item in args.field:
+        key, sep, value = item.partition("=")
+        if not sep or not key:
+            parser.error(f"--field must look like KEY=VALUE, got {item!r}")
+        fields[key] = value
+    template = None
+    if args.template is not None:
+        if args.workers != 1 or args.cache_entries or args.checkpoint:
+            parser.error(
+                "--template cannot be combined with --workers, --cache-entries or --checkpoint"
+            )
+        template = "cli"
+        try:
+            templates.register(template, args.template)
+        except ValueError as e:
+            parser.error(f"--template: {e}")
+        from string import Formatter
+
+        missing = sorted(
+            {field for _, field, _, _ in Formatter().parse(args.template) if field}
+            - {"name", *fields}
+        )
+        if missing:
+            parser.error(f"--template needs --field values for: {', '.join(missing)}")
+    elif fields:
+        parser.error("--field requires --template")
+    if args.checkpoint:
+        if not args.output:
+            parser.error("--checkpoint requires --output")
+        if len(args.files) != 1 or args.files[0] == "-" or args.files[0].endswith(".gz"):
+            parser.error("--checkpoint requires exactly one uncompressed input FILE")
+        if args.workers != 1 or args.mmap or args.metrics_file:
+            parser.error("--checkpoint cannot be combined with --workers, --mmap or --metrics-file")
+    if args.demo:
+        demo()
+        return 0
+
+    if args.checkpoint:
+        cache = None
+        if args.cache_entries:
+            cache = GreetingCache(args.cache_entries, args.cache_bytes)
+        try:
+            greet_checkpointed(
+                args.files[0],
+                args.output,
+                args.checkpoint,
+                args.checkpoint_every,
+                args.encoding,
+                cache,
+                args.batch_size,
+            )
+        except (OSError, ValueError) as e:
+            print(f"hello.py: {e}", file=sys.stderr)
+            return 1
+        if cache is not None and args.cache_stats:
+            print(f"hello.py: greeting cache {cache.stats()}", file=sys.stderr)
+        return 0
+
+    names = iter_input_names(args.files, args.encoding, args.mmap)
+    cache = None
+    exporter = None
+    metrics_ok = True
+    if args.metrics_file:
+        metrics = enable_instrumentation()
+        exporter = MetricsExporter(
+            metrics, args.metrics_file, args.metrics_interval, args.metrics_format
+        )
+        try:
+            exporter.start()
+        except OSError as e:
+            print(f"hello.py: cannot write metrics to {args.metrics_file}: {e}", file=sys.stderr)
+            return 1
+    try:
+        if args.cache_entries:
+            cache = GreetingCache(args.cache_entries, args.cache_bytes, sys.stdout.encoding)
+            sys.stdout.flush()
+            greet_many_cached(names, sys.stdout.buffer, cache, args.batch_size)
+            sys.stdout.buffer.flush()
+        elif args.workers == 1:
+            greet_many(names, sys.stdout, args.batch_size, template, fields)
+        else:
+            sys.stdout.flush()
+            greet_parallel(
+                args.files,
+                sys.stdout.buffer,
+                args.workers or None,
+                args.shard_bytes,
+                args.encoding,
+                sys.stdout.encoding,
+            )
+            sys.stdout.buffer.flush()
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into head); silence the flush at exit.
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 1
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"hello.py: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if exporter is not None:
+            metrics_ok = exporter.stop()
+        if cache is not None and args.cache_stats:
+            print(f"hello.py: greeting cache {cache.stats()}", file=sys.stderr)
+    return 0 if metrics_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
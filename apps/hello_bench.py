@@ -0,0 +1,352 @@
+"""Throughput, latency and memory benchmark suite for hello.py.
+
+Every scenario -- one combination of greeting path, name kind, output target
+and input size -- runs in a fresh interpreter so its peak RSS is its own.
+For each scenario the suite records names per second, the latency of the
+path's calls (one greet() per name for "serial", one greet_many() or
+greet_many_cached() per batch for "bulk" and "cached"; "parallel" is a single
+call and reports no latency), and peak RSS of the process and its workers.
+
+Paths:    serial, bulk, cached, parallel
+Names:    short  -- short ASCII ("user123")
+          long   -- long mixed-script Unicode
+          skewed -- short ASCII drawn from a heavy-tailed distribution
+Outputs:  devnull, file (in a temporary directory), pipe (drained by the parent)
+
+Results are written as JSON (see --results) and compared against a saved
+baseline; the exit status is 1 if any scenario's throughput dropped by more
+than --tolerance. Throughput depends on the host, so the baseline is not
+committed: record one on each machine with --save-baseline. A baseline
+from a host with another CPU count or platform is not compared against,
+and parallel scenario ids include the worker count.
+
+    python apps/hello_bench.py --sizes 1000,1000000 --paths serial,bulk
+    python apps/hello_bench.py --save-baseline
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from contextlib import ExitStack
+from datetime import UTC, datetime
+
+APPS_DIR = os.path.dirname(os.path.abspath(__file__))
+PATHS = ("serial", "bulk", "cached", "parallel")
+NAME_KINDS = ("short", "long", "skewed")
+OUTPUTS = ("devnull", "file", "pipe")
+DEFAULT_SIZES = (1, 1_000, 100_000, 1_000_000, 10_000_000)
+DEFAULT_RESULTS = os.path.join(APPS_DIR, "hello-bench-results.json")
+DEFAULT_BASELINE = os.path.join(APPS_DIR, "hello-bench-baseline.json")
+DEFAULT_TOLERANCE = 0.10
+MIN_COMPARE_SIZE = 1_000
+LATENCY_SAMPLES = 100_000
+CACHE_ENTRIES = 100_000
+LONG_NAME = "Žofie Ångström-Łukasiewicz 東京 Ωμέγα "
+
+
+def iter_bench_names(kind: str, count: int) -> Iterator[str]:
+    """Yield count deterministic names of the given kind."""
+    if kind == "short":
+        for i in range(count):
+            yield f"user{i}"
+    elif kind == "long":
+        for i in range(count):
+            yield f"{LONG_NAME * 3}{i}"
+    elif kind == "skewed":
+        import random
+
+        rng = random.Random(42)
+        for _ in range(count):
+            yield f"user{int(rng.paretovariate(1.2))}"
+    else:
+        raise ValueError(f"unknown name kind {kind!r}")
+
+
+def percentiles_us(samples_ns: list[int]) -> dict[str, float] | None:
+    """Return p50/p90/p99/max of latency samples in microseconds."""
+    if not samples_ns:
+        return None
+    samples_ns.sort()
+    last = len(samples_ns) - 1
+    return {
+        f"p{pct}": samples_ns[min(last, len(samples_ns) * pct // 100)] / 1000
+        for pct in (50, 90, 99)
+    } | {"max": samples_ns[-1] / 1000}
+
+
+def peak_rss_kb(who: int) -> int:
+    import resource
+
+    rss = resource.getrusage(who).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def run_child(spec: dict) -> dict:
+    """Run one scenario in this process and return its measurements."""
+    import resource
+    from itertools import islice
+
+    import hello
+
+    size = spec["size"]
+    names = iter_bench_names(spec["kind"], size)
+    samples: list[int] = []
+    clock = time.perf_counter_ns
+    with ExitStack() as stack:
+        if spec["output"] == "pipe":
+            out = sys.stdout
+        else:
+            target = os.devnull if spec["output"] == "devnull" else spec["file"]
+            out = stack.enter_context(open(target, "w", encoding="utf-8"))
+        if spec["path"] == "parallel":
+            # greet_parallel() reads its input from files, so write the names out
+            # before the clock starts.
+            input_path = f"{spec['file']}.in"
+            with open(input_path, "w", encoding="utf-8") as f:
+                f.writelines(f"{name}\n" for name in names)
+
+        start = time.perf_counter()
+        if spec["path"] == "serial":
+            stride = max(1, size // LATENCY_SAMPLES)
+            greet = hello.greet
+            sys.stdout = out
+            try:
+                for i, name in enumerate(names):
+                    if i % stride:
+                        greet(name)
+                    else:
+                        t = clock()
+                        greet(name)
+                        samples.append(clock() - t)
+            finally:
+                sys.stdout = sys.__stdout__
+        elif spec["path"] in ("bulk", "cached"):
+            batch_size = hello.DEFAULT_BATCH_SIZE
+            if spec["path"] == "cached":
+                cache = hello.GreetingCache(CACHE_ENTRIES)
+                out.flush()
+                binary = out.buffer
+
+                def call(batch: list[str]) -> None:
+                    hello.greet_many_cached(batch, binary, cache, batch_size)
+
+            else:
+
+                def call(batch: list[str]) -> None:
+                    hello.greet_many(batch, out, batch_size)
+
+            while batch := list(islice(names, batch_size)):
+                t = clock()
+                call(batch)
+                samples.append(clock() - t)
+        elif spec["path"] == "parallel":
+            out.flush()
+            hello.greet_parallel([input_path], out.buffer, spec["workers"])
+        else:
+            raise ValueError(f"unknown path {spec['path']!r}")
+        out.flush()
+        if spec["path"] in ("cached", "parallel"):
+            out.buffer.flush()
+        seconds = time.perf_counter() - start
+
+    return {
+        "path": spec["path"],
+        "name_kind": spec["kind"],
+        "output": spec["output"],
+        "size": size,
+        "workers": spec["workers"],
+        "seconds": seconds,
+        "names_per_second": size / seconds if seconds else 0.0,
+        "latency_us": percentiles_us(samples),
+        "peak_rss_kb": peak_rss_kb(resource.RUSAGE_SELF),
+        "workers_peak_rss_kb": peak_rss_kb(resource.RUSAGE_CHILDREN),
+    }
+
+
+def run_scenario(spec: dict) -> dict:
+    """Run one scenario in a fresh interpreter and return its measurements."""
+    with tempfile.TemporaryDirectory() as tmp:
+        spec = {**spec, "file": os.path.join(tmp, "greetings.txt")}
+        proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--child", json.dumps(spec)],
+            stdout=subprocess.PIPE if spec["output"] == "pipe" else subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        if proc.stdout is not None:
+            while proc.stdout.read(1 << 20):
+                pass
+        _, stderr_bytes = proc.communicate()
+        stderr = stderr_bytes.decode()
+        if proc.returncode != 0:
+            raise RuntimeError(f"scenario {spec} failed:\n{stderr}")
+    return json.loads(stderr.splitlines()[-1])
+
+
+def scenario_id(result: dict) -> str:
+    sid = f"{result['path']}/{result['name_kind']}/{result['output']}/{result['size']}"
+    if result["path"] == "parallel":
+        sid += f"/{result['workers']}w"
+    return sid
+
+
+def compare(runs: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Print a comparison against baseline runs and return regressed scenario ids."""
+    regressed = []
+    missing = 0
+    for sid, run in runs.items():
+        base = baseline.get(sid)
+        if base is None or not base["names_per_second"]:
+            missing += 1
+            continue
+        ratio = run["names_per_second"] / base["names_per_second"]
+        flag = ""
+        if run["size"] >= MIN_COMPARE_SIZE and ratio < 1 - tolerance:
+            regressed.append(sid)
+            flag = "  REGRESSION"
+        print(
+            f"{sid:40} {run['names_per_second']:>14,.0f} names/s "
+            f"vs {base['names_per_second']:>14,.0f} ({ratio:6.1%}){flag}"
+        )
+    if missing:
+        print(f"{missing} scenario(s) are not in the baseline and were not compared")
+    return regressed
+
+
+def parse_list(value: str, choices: tuple[str, ...]) -> list[str]:
+    items = [item.strip() for item in value.split(",") if item.strip()]
+    unknown = sorted(set(items) - set(choices))
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"unknown value(s) {', '.join(unknown)}; choose from {', '.join(choices)}"
+        )
+    return items
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument(
+        "--sizes",
+        type=lambda v: [int(size) for size in v.split(",")],
+        default=list(DEFAULT_SIZES),
+        help=f"comma-separated input sizes (default: {','.join(map(str, DEFAULT_SIZES))})",
+    )
+    parser.add_argument(
+        "--paths",
+        type=lambda v: parse_list(v, PATHS),
+        default=list(PATHS),
+        help=f"comma-separated greeting paths (default: {','.join(PATHS)})",
+    )
+    parser.add_argument(
+        "--names",
+        type=lambda v: parse_list(v, NAME_KINDS),
+        default=list(NAME_KINDS),
+        help=f"comma-separated name kinds (default: {','.join(NAME_KINDS)})",
+    )
+    parser.add_argument(
+        "--outputs",
+        type=lambda v: parse_list(v, OUTPUTS),
+        default=list(OUTPUTS),
+        help=f"comma-separated output targets (default: {','.join(OUTPUTS)})",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="workers for the parallel path"
+    )
+    parser.add_argument(
+        "--results",
+        default=DEFAULT_RESULTS,
+        help="results file (default: hello-bench-results.json next to this script)",
+    )
+    parser.add_argument(
+        "--baseline",
+        default=DEFAULT_BASELINE,
+        help="baseline results file to compare against (default: hello-bench-baseline.json next to this script)",
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="also write the results to --baseline"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help=f"allowed fractional throughput drop vs. baseline (default: {DEFAULT_TOLERANCE})",
+    )
+    args = parser.parse_args(argv)
+
+    if args.child is not None:
+        print(json.dumps(run_child(json.loads(args.child))), file=sys.stderr)
+        return 0
+
+    runs: dict[str, dict] = {}
+    for path in args.paths:
+        for kind in args.names:
+            for output in args.outputs:
+                for size in args.sizes:
+                    spec = {
+                        "path": path,
+                        "kind": kind,
+                        "output": output,
+                        "size": size,
+                        "workers": args.workers,
+                    }
+                    result = run_scenario(spec)
+                    runs[scenario_id(result)] = result
+                    latency = result["latency_us"] or {}
+                    print(
+                        f"{scenario_id(result):40} {result['names_per_second']:>14,.0f} names/s"
+                        f"  p99 {latency.get('p99', float('nan')):>9.2f} us"
+                        f"  rss {result['peak_rss_kb']:>8,} KB",
+                        file=sys.stderr,
+                    )
+
+    report = {
+        "suite": "apps/hello_bench.py",
+        "created_at": datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "runs": runs,
+    }
+    with open(args.results, "w") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+    print(f"results written to {args.results}")
+
+    regressed: list[str] = []
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"baseline written to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        host = (baseline.get("cpu_count"), baseline.get("platform"))
+        if host != (report["cpu_count"], report["platform"]):
+            print(
+                f"baseline {args.baseline} was recorded on another host "
+                f"({host[0]} CPUs, {host[1]}); not comparing "
+                "(record one here with --save-baseline)"
+            )
+        else:
+            print(f"comparing against {args.baseline} ({baseline.get('created_at')})")
+            regressed = compare(runs, baseline["runs"], args.tolerance)
+    else:
+        print(f"no baseline at {args.baseline}; not comparing (record one with --save-baseline)")
+
+    if regressed:
+        print(f"FAIL: {len(regressed)} scenario(s) regressed", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""Load generator for hello_server.py.
+
+Opens --connections connections and sends --requests names over each,
+keeping up to --pipeline names outstanding per connection. Latency is
+measured per name, from the write of the name to the arrival of its greeting
+line; the report gives p50/p99 latency and overall requests per second.
+
+    python apps/hello_loadgen.py --port 8765 --connections 8 --requests 10000
+    python apps/hello_loadgen.py --unix /tmp/hello.sock --pipeline 1
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+
+from hello_server import DEFAULT_HOST, DEFAULT_PORT
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Return the nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+async def _connect(
+    host: str, port: int, unix_path: str | None
+) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    if unix_path is not None:
+        return await asyncio.open_unix_connection(unix_path)
+    return await asyncio.open_connection(host, port)
+
+
+async def run_connection(
+    host: str,
+    port: int,
+    unix_path: str | None,
+    requests: int,
+    pipeline: int,
+    latencies: list[float],
+) -> None:
+    """Send requests names on one connection and record each round-trip latency."""
+    reader, writer = await _connect(host, port, unix_path)
+    sent_at: deque[float] = deque()
+    window = asyncio.Semaphore(pipeline)
+
+    async def send() -> None:
+        for i in range(requests):
+            await window.acquire()
+            sent_at.append(time.perf_counter())
+            writer.write(f"user-{i}\n".encode())
+            await writer.drain()
+
+    sender = asyncio.create_task(send())
+    try:
+        for _ in range(requests):
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("server closed the connection")
+            latencies.append(time.perf_counter() - sent_at.popleft())
+            window.release()
+        await sender
+    finally:
+        sender.cancel()
+        writer.close()
+
+
+async def run(
+    host: str,
+    port: int,
+    unix_path: str | None,
+    connections: int,
+    requests: int,
+    pipeline: int,
+) -> dict[str, float]:
+    """Run the load test and return its summary statistics."""
+    latencies: list[float] = []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            run_connection(host, port, unix_path, requests, pipeline, latencies)
+            for _ in range(connections)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "seconds": elapsed,
+        "requests_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test hello_server.py.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="PATH", help="connect to a Unix domain socket")
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=10000, help="names per connection")
+    parser.add_argument(
+        "--pipeline", type=int, default=32, help="max outstanding names per connection"
+    )
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args(argv)
+    for option in ("connections", "requests", "pipeline"):
+        if getattr(args, option) < 1:
+            parser.error(f"--{option} must be at least 1")
+
+    try:
+        summary = asyncio.run(
+            run(
+                args.host,
+                args.port,
+                args.unix,
+                args.connections,
+                args.requests,
+                args.pipeline,
+            )
+        )
+    except OSError as e:
+        print(f"hello_loadgen: {e}", file=sys.stderr)
+        return 1
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(
+            f"{summary['requests']:.0f} requests in {summary['seconds']:.2f} s: "
+            f"{summary['requests_per_second']:.0f} req/s, "
+            f"p50 {summary['p50_ms']:.3f} ms, p99 {summary['p99_ms']:.3f} ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""Long-running asyncio greeting server.
+
+Clients send newline-delimited names over TCP or a Unix domain socket and
+receive one "Hello, {name}!" line per name, in order. Names may be pipelined:
+everything that has arrived on a connection is greeted with a single write.
+
+Backpressure: after each write the handler awaits ``writer.drain()``, which
+blocks once the transport buffers more than --write-high-water bytes, and no
+more input is read from that client until the buffer drains. Connections over
+--max-connections are closed straight away, as is a connection that sends a
+line longer than MAX_LINE_BYTES (after an "ERROR: line too long" line).
+With --cache-entries, encoded greetings for repeated names are served from
+a GreetingCache shared by all connections.
+
+    python apps/hello_server.py --port 8765
+    python apps/hello_server.py --unix /tmp/hello.sock --max-connections 64
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import stat
+import sys
+
+from hello import DEFAULT_CACHE_BYTES, GreetingCache, format_greetings
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_CONNECTIONS = 256
+DEFAULT_WRITE_HIGH_WATER = 256 * 1024
+READ_SIZE = 64 * 1024
+MAX_LINE_BYTES = 64 * 1024
+
+
+class GreetingServer:
+    """Serve greetings for newline-delimited names on stream connections."""
+
+    def __init__(
+        self,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        write_high_water: int = DEFAULT_WRITE_HIGH_WATER,
+        cache: GreetingCache | None = None,
+    ) -> None:
+        self.max_connections = max_connections
+        self.write_high_water = write_high_water
+        self.cache = cache
+        self.active = 0
+        self.rejected = 0
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        if self.active >= self.max_connections:
+            self.rejected += 1
+            writer.close()
+            return
+        self.active += 1
+        try:
+            writer.transport.set_write_buffer_limits(high=self.write_high_water)
+            await self._serve(reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.active -= 1
+            writer.close()
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        pending = b""
+        while True:
+            data = await reader.read(READ_SIZE)
+            if not data:
+                break
+            lines = (pending + data).split(b"\n")
+            pending = lines.pop()
+            if len(pending) > MAX_LINE_BYTES:
+                if lines:
+                    writer.write(self._greetings(lines))
+                writer.write(b"ERROR: line too long\n")
+                await writer.drain()
+                return
+            if lines:
+                writer.write(self._greetings(lines))
+                await writer.drain()
+        if pending:
+            writer.write(self._greetings([pending]))
+            await writer.drain()
+
+    def _greetings(self, lines: list[bytes]) -> bytes:
+        names = [line.decode("utf-8", "replace").removesuffix("\r") for line in lines]
+        if self.cache is not None:
+            return b"".join(self.cache.lines(names))
+        return format_greetings(names).encode()
+
+
+async def serve(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    unix_path: str | None = None,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    write_high_water: int = DEFAULT_WRITE_HIGH_WATER,
+    cache: GreetingCache | None = None,
+) -> None:
+    """Run a GreetingServer on a TCP address, or on unix_path if given, forever."""
+    handler = GreetingServer(max_connections, write_high_water, cache).handle
+    if unix_path is not None:
+        # Only replace a stale socket; never delete some other file.
+        try:
+            mode = os.stat(unix_path).st_mode
+        except FileNotFoundError:
+            pass
+        else:
+            if not stat.S_ISSOCK(mode):
+                raise FileExistsError(f"{unix_path} exists and is not a socket")
+            os.unlink(unix_path)
+        server = await asyncio.start_unix_server(handler, path=unix_path)
+    else:
+        server = await asyncio.start_server(handler, host, port)
+    addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+    print(f"hello_server: listening on {addresses}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve greetings over a socket.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix domain socket")
+    parser.add_argument(
+        "--max-connections",
+        type=int,
+        default=DEFAULT_MAX_CONNECTIONS,
+        help=f"close connections beyond this many (default: {DEFAULT_MAX_CONNECTIONS})",
+    )
+    parser.add_argument(
+        "--write-high-water",
+        type=int,
+        default=DEFAULT_WRITE_HIGH_WATER,
+        help=f"per-connection buffered bytes before reads pause (default: {DEFAULT_WRITE_HIGH_WATER})",
+    )
+    parser.add_argument(
+        "--cache-entries",
+        type=int,
+        default=0,
+        help="memoize encoded greetings for up to this many distinct names (default: off)",
+    )
+    parser.add_argument(
+        "--cache-bytes",
+        type=int,
+        default=DEFAULT_CACHE_BYTES,
+        help=f"max encoded bytes held by --cache-entries (default: {DEFAULT_CACHE_BYTES})",
+    )
+    args = parser.parse_args(argv)
+    if args.max_connections < 1:
+        parser.error("--max-connections must be at least 1")
+    if args.write_high_water < 1:
+        parser.error("--write-high-water must be at least 1")
+    if args.cache_entries < 0:
+        parser.error("--cache-entries must not be negative")
+    if args.cache_bytes < 1:
+        parser.error("--cache-bytes must be at least 1")
+    cache = GreetingCache(args.cache_entries, args.cache_bytes) if args.cache_entries else None
+
+    try:
+        asyncio.run(
+            serve(
+                args.host,
+                args.port,
+                args.unix,
+                args.max_connections,
+                args.write_high_water,
+                cache,
+            )
+        )
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"hello_server: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
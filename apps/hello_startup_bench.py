@@ -0,0 +1,113 @@
+"""Startup benchmark for hello.py: fails when importing the module gets slow.
+
+Two measurements are taken, each as the median of --repeat fresh processes:
+
+* import time -- the cumulative microseconds reported for ``hello`` by
+  ``python -X importtime -c "import hello"``;
+* cold start -- wall-clock time of ``python -c "import hello"`` minus that of
+  ``python -c "pass"``, i.e. what importing hello adds to a new process.
+
+The exit status is 1 if either median is over its budget, so the script can
+gate CI:
+
+    python apps/hello_startup_bench.py --import-budget-us 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+APPS_DIR = os.path.dirname(os.path.abspath(__file__))
+MODULE = "hello"
+DEFAULT_REPEAT = 20
+DEFAULT_IMPORT_BUDGET_US = 2000
+DEFAULT_STARTUP_BUDGET_MS = 5.0
+
+
+def _env() -> dict[str, str]:
+    # Let the interpreter cache bytecode so we time the import, not the compile.
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+
+def _run(args: list[str]) -> subprocess.CompletedProcess[str]:
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=APPS_DIR,
+        env=_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def import_time_us(module: str = MODULE) -> int:
+    """Return the cumulative import time of module in a fresh interpreter."""
+    result = _run(["-X", "importtime", "-c", f"import {module}"])
+    for line in reversed(result.stderr.splitlines()):
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1])
+    raise RuntimeError(f"no -X importtime entry for {module!r}:\n{result.stderr}")
+
+
+def process_time_s(code: str) -> float:
+    """Return the wall-clock time of running python -c code in a fresh process."""
+    start = time.perf_counter()
+    _run(["-c", code])
+    return time.perf_counter() - start
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument(
+        "--import-budget-us",
+        type=int,
+        default=DEFAULT_IMPORT_BUDGET_US,
+        help=f"max median -X importtime for hello (default: {DEFAULT_IMPORT_BUDGET_US})",
+    )
+    parser.add_argument(
+        "--startup-budget-ms",
+        type=float,
+        default=DEFAULT_STARTUP_BUDGET_MS,
+        help=f"max median cold-start overhead of importing hello (default: {DEFAULT_STARTUP_BUDGET_MS})",
+    )
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    # Warm-up run: writes the bytecode cache and pulls files into the page cache.
+    _run(["-c", f"import {MODULE}"])
+
+    import_us = statistics.median(import_time_us() for _ in range(args.repeat))
+    baseline_s = statistics.median(process_time_s("pass") for _ in range(args.repeat))
+    hello_s = statistics.median(
+        process_time_s(f"import {MODULE}") for _ in range(args.repeat)
+    )
+    startup_ms = max(hello_s - baseline_s, 0.0) * 1000
+
+    print(f"import time: {import_us:.0f} us (budget {args.import_budget_us} us)")
+    print(
+        f"cold start:  {startup_ms:.2f} ms over a bare interpreter "
+        f"of {baseline_s * 1000:.2f} ms (budget {args.startup_budget_ms} ms)"
+    )
+
+    failed = False
+    if import_us > args.import_budget_us:
+        print("FAIL: import time is over budget", file=sys.stderr)
+        failed = True
+    if startup_ms > args.startup_budget_ms:
+        print("FAIL: cold start is over budget", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
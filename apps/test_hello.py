@@ -0,0 +1,330 @@
+import io
+
+import hello
+import pytest
+
+
+@pytest.mark.parametrize(
+    ("source", "fields", "expected"),
+    [
+        ("Welcome!", {}, "Welcome!"),
+        ("Hello there!", {"name": "ignored"}, "Hello there!"),
+        ("}}{{", {}, "}{"),
+        ("", {}, ""),
+        ("Hello, {name}!", {"name": "Ada"}, "Hello, Ada!"),
+        (
+            "Dear {title} {surname}, {name}",
+            {"title": "Dr.", "surname": "Lovelace", "name": "Ada"},
+            "Dear Dr. Lovelace, Ada",
+        ),
+        ("{name}/{name}", {"name": "x"}, "x/x"),
+        ("Hi {name!r}", {"name": "Ada"}, "Hi 'Ada'"),
+        ("[{name:>5}]", {"name": "Ada"}, "[  Ada]"),
+        ("#{count:03d}", {"count": 7}, "#007"),
+        ("{name!r:>7}", {"name": "Ada"}, "  'Ada'"),
+        ("back\\slash 'q\" {name}", {"name": "A"}, "back\\slash 'q\" A"),
+    ],
+)
+def test_compile_template(source, fields, expected):
+    assert hello.compile_template(source)(**fields) == expected
+
+
+@pytest.mark.parametrize(
+    "source", ["{}", "{0}", "{a.b}", "{a[0]}", "{_x}", "{class}", "{a!z}", "{", "{a:{b}}"]
+)
+def test_compile_template_rejects_unsupported_fields(source):
+    with pytest.raises(ValueError):
+        hello.compile_template(source)
+
+
+def test_register_fieldless_template():
+    registry = hello.TemplateRegistry()
+    registry.register("welcome", "Welcome!")
+    assert registry.get("welcome")(name="Ada") == "Welcome!"
+
+
+def test_template_registry_lru():
+    registry = hello.TemplateRegistry(maxsize=2)
+    for key in "abc":
+        registry.register(key, key + "{name}")
+    assert registry.stats() == {
+        "hits": 0,
+        "misses": 3,
+        "evictions": 1,
+        "size": 2,
+        "maxsize": 2,
+    }
+    registry.get("b")  # hit; "c" becomes least recently used
+    registry.get("a")  # miss; evicts "c"
+    registry.get("b")  # still cached
+    assert registry.stats()["hits"] == 2
+    assert registry.stats()["evictions"] == 2
+    registry.clear()
+    assert registry.stats()["size"] == 0
+
+
+def test_greet_many_with_template(monkeypatch):
+    registry = hello.TemplateRegistry()
+    registry.register("hi", "Hi {name}.")
+    monkeypatch.setattr(hello, "templates", registry)
+    out = io.StringIO()
+    assert hello.greet_many(["a", "b", "c"], out, batch_size=2, template="hi") == 3
+    assert out.getvalue() == "Hi a.\nHi b.\nHi c.\n"
+
+
+def test_greet_many_with_multi_field_template(monkeypatch):
+    registry = hello.TemplateRegistry()
+    registry.register("formal", "Dear {title} {surname}, {name}")
+    monkeypatch.setattr(hello, "templates", registry)
+    fields = {"title": "Dr.", "surname": "Lovelace"}
+    out = io.StringIO()
+    assert hello.greet_many(["Ada", "A."], out, 1, "formal", fields) == 2
+    assert out.getvalue() == "Dear Dr. Lovelace, Ada\nDear Dr. Lovelace, A.\n"
+
+
+def test_main_with_template(mixed_file, capsys, monkeypatch):
+    monkeypatch.setattr(hello, "templates", hello.TemplateRegistry())
+    args = [mixed_file, "--template", "{greeting}, {name}.", "--field", "greeting=Hi"]
+    assert hello.main(args) == 0
+    assert capsys.readouterr().out == "".join(f"Hi, {name}.\n" for name in MIXED_NAMES)
+    with pytest.raises(SystemExit):
+        hello.main([mixed_file, "--template", "{greeting}, {name}."])
+
+
+def test_greet_many_matches_greet(capsys):
+    names = ["Ada", "Zoë", "x\ny", ""]
+    for name in names:
+        hello.greet(name)
+    expected = capsys.readouterr().out
+    out = io.StringIO()
+    assert hello.greet_many(names, out, batch_size=3) == len(names)
+    assert out.getvalue() == expected
+
+
+def test_greeting_cache_lru_order():
+    cache = hello.GreetingCache(max_entries=2)
+    cache.lines(["a", "b"])
+    cache.line("a")  # hit; "b" becomes least recently used
+    cache.line("c")  # miss; evicts "b"
+    assert cache.line("a") == b"Hello, a!\n"
+    assert cache.stats()["evictions"] == 1
+    cache.line("b")  # miss; evicts "c"
+    assert (cache.hits, cache.misses, cache.evictions) == (2, 4, 2)
+    assert cache.hit_rate() == 2 / 6
+
+
+def test_greeting_cache_byte_bound():
+    line_bytes = len(b"Hello, a!\n")
+    cache = hello.GreetingCache(max_entries=10, max_bytes=2 * line_bytes + 5)
+    cache.lines(["a", "b", "c"])
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["evictions"]) == (2, 2 * line_bytes, 1)
+    cache.line("b")
+    assert cache.hits == 1
+
+
+def test_greeting_cache_never_caches_oversized_lines():
+    cache = hello.GreetingCache(max_entries=10, max_bytes=12)
+    assert cache.lines(["a", "a long name", "a"]) == [
+        b"Hello, a!\n",
+        b"Hello, a long name!\n",
+        b"Hello, a!\n",
+    ]
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["hits"], stats["misses"]) == (1, 10, 1, 2)
+    cache.clear()
+    assert cache.stats()["entries"] == cache.hit_rate() == 0
+
+
+def test_greet_many_cached_matches_greet_many():
+    names = [f"n{i % 7}é" for i in range(50)] + ["東京", ""]
+    cache = hello.GreetingCache(max_entries=4, max_bytes=64)
+    out = io.BytesIO()
+    assert hello.greet_many_cached(names, out, cache, batch_size=3) == len(names)
+    expected = io.StringIO()
+    hello.greet_many(names, expected)
+    assert out.getvalue() == expected.getvalue().encode()
+    assert cache.evictions > 0
+
+
+def test_greeting_cache_shared_across_threads():
+    from concurrent.futures import ThreadPoolExecutor
+
+    cache = hello.GreetingCache(max_entries=16)
+    names = [f"name{i % 24}" for i in range(2000)]
+    expected = [f"Hello, {name}!\n".encode() for name in names]
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: cache.lines(names), range(16)))
+    assert all(result == expected for result in results)
+    stats = cache.stats()
+    assert stats["hits"] + stats["misses"] == 16 * len(names)
+    assert stats["entries"] == 16
+    assert stats["bytes"] == sum(len(line) for line in cache.lines(names[-16:]))
+
+
+class ListWriter:
+    """A minimal stream: write() only, no encoding attribute."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(data)
+
+
+@pytest.fixture
+def metrics():
+    metrics = hello.enable_instrumentation()
+    yield metrics
+    hello.disable_instrumentation()
+
+
+def test_instrumented_greet_many_accepts_any_writer(metrics):
+    out = ListWriter()
+    assert hello.greet_many(["a", "é"], out, batch_size=1) == 2
+    assert "".join(out.parts) == "Hello, a!\nHello, é!\n"
+    assert metrics.greetings == 2
+    assert metrics.bytes_written == len("Hello, a!\nHello, é!\n".encode())
+
+
+def test_instrumented_greet_many_with_template_fields(metrics, monkeypatch):
+    registry = hello.TemplateRegistry()
+    registry.register("formal", "Dear {title} {name}")
+    monkeypatch.setattr(hello, "templates", registry)
+    out = io.StringIO()
+    assert hello.greet_many(["Ada"], out, template="formal", fields={"title": "Dr."}) == 1
+    assert out.getvalue() == "Dear Dr. Ada\n"
+    assert metrics.greetings == 1
+
+
+def test_instrumentation_labels_greet_and_batch_sources(metrics, capsys):
+    calls = []
+    metrics.add_hook(before=lambda n: calls.append(("before", n)), after=lambda n: calls.append(("after", n)))
+    hello.greet("x")
+    hello.greet_many(["y", "z"], io.StringIO(), batch_size=2)
+    assert capsys.readouterr().out == "Hello, x!\n"
+    assert calls == [("before", "x"), ("after", "x"), ("before", "y"), ("before", "z"), ("after", "y"), ("after", "z")]
+    assert metrics.format_seconds["greet"].count == 1
+    assert metrics.format_seconds["batch"].count == 1
+    text = metrics.prometheus_text()
+    assert 'hello_write_seconds_count{source="greet"} 1' in text
+    assert 'hello_write_seconds_count{source="batch"} 1' in text
+    assert "hello_greetings_total 3" in text
+
+
+@pytest.fixture
+def job(tmp_path):
+    lines = [f"name{i}" for i in range(50)] + ["", "Zoë", "x\ry", "\r", "z\r"]
+    input_path = tmp_path / "names.txt"
+    input_path.write_bytes(("\n".join(lines) + "\n").encode())
+    names = [f"name{i}" for i in range(50)] + ["Zoë", "x", "y", "z"]
+    expected = hello.format_greetings(names).encode()
+    return str(input_path), str(tmp_path / "out.txt"), str(tmp_path / "job.ckpt"), expected
+
+
+def test_checkpointed_resume_after_crash(job, monkeypatch):
+    input_path, output_path, checkpoint_path, expected = job
+    write_checkpoint = hello.write_checkpoint
+    saves = []
+
+    def crash_on_third_save(path, checkpoint):
+        saves.append(checkpoint["count"])
+        if len(saves) == 3:
+            raise KeyboardInterrupt
+        write_checkpoint(path, checkpoint)
+
+    monkeypatch.setattr(hello, "write_checkpoint", crash_on_third_save)
+    with pytest.raises(KeyboardInterrupt):
+        hello.greet_checkpointed(input_path, output_path, checkpoint_path, 10, batch_size=3)
+    assert saves == [10, 20, 30]
+    # Greetings past the last saved checkpoint reached the file before the crash.
+    with open(output_path, "rb") as f:
+        assert len(f.read()) > len(b"".join(expected.splitlines(True)[:20]))
+
+    monkeypatch.setattr(hello, "write_checkpoint", write_checkpoint)
+    checkpoint = hello.greet_checkpointed(
+        input_path, output_path, checkpoint_path, 10, batch_size=3
+    )
+    assert checkpoint["done"] and checkpoint["count"] == 54
+    with open(output_path, "rb") as f:
+        assert f.read() == expected
+
+    # Rerunning a finished job changes nothing.
+    assert hello.greet_checkpointed(input_path, output_path, checkpoint_path, 10) == checkpoint
+    with open(output_path, "rb") as f:
+        assert f.read() == expected
+
+
+def test_checkpointed_rejects_changed_input(job):
+    input_path, output_path, checkpoint_path, _ = job
+    hello.greet_checkpointed(input_path, output_path, checkpoint_path, 10)
+    with open(input_path, "a", encoding="utf-8") as f:
+        f.write("late\n")
+    with pytest.raises(ValueError, match="input_size"):
+        hello.greet_checkpointed(input_path, output_path, checkpoint_path, 10)
+
+
+def test_checkpointed_rejects_other_output(job, tmp_path):
+    input_path, output_path, checkpoint_path, _ = job
+    hello.greet_checkpointed(input_path, output_path, checkpoint_path, 10)
+    with pytest.raises(ValueError, match="output"):
+        hello.greet_checkpointed(input_path, str(tmp_path / "other.txt"), checkpoint_path, 10)
+
+
+# Blank lines, CRLF and bare CR line endings, multibyte UTF-8 and no final newline.
+MIXED_INPUT = "Ada\n\nZoë\r\nx\ry\r\n\r\n東京 Ωμέγα\nłast".encode()
+MIXED_NAMES = ["Ada", "Zoë", "x", "y", "東京 Ωμέγα", "łast"]
+
+
+@pytest.fixture
+def mixed_file(tmp_path):
+    path = tmp_path / "names.txt"
+    path.write_bytes(MIXED_INPUT)
+    return str(path)
+
+
+def test_iter_names_drops_line_endings_and_blanks():
+    assert list(hello.iter_names(["a\n", "\n", "b\r\n", "\r\n", "c"])) == ["a", "b", "c"]
+
+
+def test_iter_input_names_text_mode(mixed_file):
+    assert list(hello.iter_input_names([mixed_file])) == MIXED_NAMES
+
+
+def test_iter_input_names_gzip(mixed_file):
+    import gzip
+
+    gz_path = mixed_file + ".gz"
+    with gzip.open(gz_path, "wb") as f:
+        f.write(MIXED_INPUT)
+    assert list(hello.iter_input_names([gz_path])) == MIXED_NAMES
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, 7, 1 << 20])
+def test_iter_input_names_mmap_matches_text_mode(mixed_file, monkeypatch, chunk_size):
+    monkeypatch.setattr(hello, "MMAP_CHUNK_SIZE", chunk_size)
+    assert list(hello.iter_input_names([mixed_file], use_mmap=True)) == MIXED_NAMES
+
+
+def test_main_greets_files(mixed_file, capsys):
+    assert hello.main([mixed_file, "--mmap"]) == 0
+    assert capsys.readouterr().out == hello.format_greetings(MIXED_NAMES)
+
+
+@pytest.mark.parametrize("content", [None, b"ok\n\xff\n"], ids=["missing", "undecodable"])
+def test_main_reports_bad_input(tmp_path, capsys, content):
+    path = tmp_path / "names.txt"
+    if content is not None:
+        path.write_bytes(content)
+    assert hello.main([str(path)]) == 1
+    assert capsys.readouterr().err.startswith("hello.py: ")
+
+
+@pytest.mark.parametrize("shard_bytes", [1, 7, 1 << 20])
+def test_greet_parallel_matches_serial(mixed_file, shard_bytes):
+    serial = io.StringIO()
+    expected_count = hello.greet_many(hello.iter_input_names([mixed_file]), serial)
+    out = io.BytesIO()
+    count = hello.greet_parallel([mixed_file, mixed_file], out, 2, shard_bytes)
+    assert count == 2 * expected_count
+    assert out.getvalue() == 2 * serial.getvalue().encode()